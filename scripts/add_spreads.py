@@ -11,16 +11,32 @@ Adds 4 new columns:
 """
 
 import argparse
+import glob
+import hashlib
 import os
-import subprocess
+import pickle
+import sys
 import tempfile
 from datetime import datetime
+from email.utils import formatdate, parsedate_to_datetime
+import numpy as np
+import requests
 from openpyxl import load_workbook
+from python_calamine import CalamineError, CalamineWorkbook
 from openpyxl.styles import Font, Alignment, PatternFill, Border, Side
 from openpyxl.utils import get_column_letter
 
 BETTING_URL = "https://www.aussportsbetting.com/historical_data/nfl.xlsx"
 
+CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "nfl-db")
+CACHED_BETTING_FILE = os.path.join(CACHE_DIR, "nfl.xlsx")
+# Bump whenever build_betting_lookup's output changes (columns, skip rules,
+# key format) so older pickled lookups are not reused
+LOOKUP_CACHE_VERSION = 1
+
+SESSION = requests.Session()
+SESSION.headers.update({"User-Agent": "nfl-historical-db/add_spreads"})
+
 # Columns in existing spreadsheet (0-indexed)
 COL_DATE = 3
 COL_HOME = 5
@@ -42,41 +58,157 @@ AB_HOME = 1
 AB_HOME_LINE_CLOSE = 19
 AB_TOTAL_SCORE_CLOSE = 35
 
+# Result labels, indexed by the codes returned from classify_results
+SPREAD_LABELS = np.array(["", "Covered", "Lost", "Push"], dtype=object)
+OU_LABELS = np.array(["", "Over", "Under", "Push"], dtype=object)
+
+# Shared cell styles (built once, assigned by reference)
+HEADER_FONT = Font(name="Calibri", bold=True, color="FFFFFF", size=11)
+HEADER_FILL = PatternFill(start_color="013369", end_color="013369", fill_type="solid")
+HEADER_ALIGNMENT = Alignment(horizontal="center", vertical="center", wrap_text=True)
+ALIGN_CENTER = Alignment(horizontal="center")
+THIN_BORDER = Border(bottom=Side(style="thin", color="DDDDDD"))
+COVERED_FILL = PatternFill(start_color="D4EDDA", end_color="D4EDDA", fill_type="solid")
+LOST_FILL = PatternFill(start_color="F8D7DA", end_color="F8D7DA", fill_type="solid")
+OVER_FILL = PatternFill(start_color="FFF3CD", end_color="FFF3CD", fill_type="solid")
+
+
+def download_betting_data(use_cache=True):
+    """Download the Aussportsbetting Excel file.
+
+    With the cache enabled the workbook is kept in CACHE_DIR and only
+    re-downloaded when the server reports it has changed.
+    """
+    if not use_cache:
+        tmp = tempfile.NamedTemporaryFile(suffix=".xlsx", delete=False)
+        tmp.close()
+        target = tmp.name
+    else:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        tmp = tempfile.NamedTemporaryFile(suffix=".xlsx", dir=CACHE_DIR, delete=False)
+        tmp.close()
+        target = CACHED_BETTING_FILE
+
+    headers = {}
+    if use_cache and os.path.exists(target):
+        headers["If-Modified-Since"] = formatdate(os.path.getmtime(target), usegmt=True)
 
-def download_betting_data():
-    """Download the Aussportsbetting Excel file."""
-    tmp = tempfile.NamedTemporaryFile(suffix=".xlsx", delete=False)
-    tmp.close()
     print(f"Downloading betting data from {BETTING_URL}...")
-    result = subprocess.run(
-        ["curl", "-s", "-L", "-o", tmp.name, BETTING_URL],
-        capture_output=True, text=True, timeout=60
-    )
-    if result.returncode != 0:
-        print(f"  Download failed: {result.stderr}")
+    try:
+        response = SESSION.get(BETTING_URL, headers=headers, timeout=60)
+        error = None if response.status_code in (200, 304) else f"HTTP {response.status_code}"
+    except requests.RequestException as e:
+        response, error = None, str(e)
+
+    if error:
+        print(f"  Download failed: {error}")
+        os.unlink(tmp.name)
+        if use_cache and os.path.exists(target):
+            print("  Falling back to cached copy")
+            return target
         return None
-    size_kb = os.path.getsize(tmp.name) / 1024
+
+    if response.status_code == 304:
+        os.unlink(tmp.name)
+        print("  Not modified — using cached copy")
+        return target
+
+    with open(tmp.name, "wb") as f:
+        f.write(response.content)
+
+    # A 200 can still carry an error page, so only keep the body if it opens
+    try:
+        CalamineWorkbook.from_path(tmp.name).get_sheet_by_index(0)
+    except (CalamineError, IndexError) as e:
+        print(f"  Downloaded file is not a valid workbook: {e}")
+        os.unlink(tmp.name)
+        if use_cache and os.path.exists(target):
+            print("  Falling back to cached copy")
+            return target
+        return None
+
+    # Stamp the file with the server's Last-Modified so the next
+    # If-Modified-Since check compares against the upstream version
+    last_modified = response.headers.get("Last-Modified")
+    if last_modified:
+        try:
+            mtime = parsedate_to_datetime(last_modified).timestamp()
+            os.utime(tmp.name, (mtime, mtime))
+        except (TypeError, ValueError):
+            pass
+
+    if use_cache:
+        os.replace(tmp.name, target)
+    size_kb = os.path.getsize(target) / 1024
     print(f"  Downloaded {size_kb:.0f} KB")
-    return tmp.name
+    return target
+
+
+def load_betting_lookup(filepath, use_cache=True):
+    """Return the betting lookup for filepath, reusing a pickled copy keyed by file hash.
+
+    Only the newest pickle is kept; others are removed when a new one is written.
+    """
+    if not use_cache:
+        return build_betting_lookup(filepath)
+
+    with open(filepath, "rb") as f:
+        digest = hashlib.sha256(f.read()).hexdigest()
+    cache_path = os.path.join(CACHE_DIR, f"lookup-v{LOOKUP_CACHE_VERSION}-{digest}.pkl")
+
+    if os.path.exists(cache_path):
+        try:
+            with open(cache_path, "rb") as f:
+                lookup = pickle.load(f)
+            # Interning doesn't survive pickling; restore it for fast key matches
+            lookup = {(sys.intern(d), sys.intern(h)): v for (d, h), v in lookup.items()}
+            print(f"  Loaded cached lookup with {len(lookup)} games")
+            return lookup
+        except (OSError, pickle.UnpicklingError, EOFError) as e:
+            print(f"  Ignoring unreadable lookup cache: {e}")
+
+    lookup = build_betting_lookup(filepath)
+
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    tmp = tempfile.NamedTemporaryFile(suffix=".pkl", dir=CACHE_DIR, delete=False)
+    with tmp:
+        pickle.dump(lookup, tmp, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp.name, cache_path)
+
+    for stale in glob.glob(os.path.join(CACHE_DIR, "lookup-*.pkl")):
+        if stale != cache_path:
+            try:
+                os.unlink(stale)
+            except OSError:
+                pass
+    return lookup
 
 
 def build_betting_lookup(filepath):
     """Build a lookup dict: (date_str, home_team) -> {spread, ou}"""
-    wb = load_workbook(filepath, read_only=True, data_only=True)
-    ws = wb.active
+    wb = CalamineWorkbook.from_path(filepath)
+    ws = wb.get_sheet_by_index(0)
+    rows = ws.to_python(skip_empty_area=True)
     lookup = {}
+    # Games share dates, so format each distinct date only once. Key strings
+    # are interned so merge_into_excel's lookups can match on identity.
+    date_cache = {}
 
-    for row in ws.iter_rows(min_row=2, values_only=True):
-        if row[AB_DATE] is None:
+    for row in rows[1:]:
+        # calamine reports empty cells as "" rather than None
+        if row[AB_DATE] in (None, ""):
             continue
 
         raw_date = row[AB_DATE]
-        if isinstance(raw_date, datetime):
-            date_str = raw_date.strftime("%Y-%m-%d")
-        else:
-            date_str = str(raw_date)[:10]
-
-        home = str(row[AB_HOME] or "").strip()
+        date_str = date_cache.get(raw_date)
+        if date_str is None:
+            if isinstance(raw_date, datetime):
+                date_str = raw_date.strftime("%Y-%m-%d")
+            else:
+                date_str = str(raw_date)[:10]
+            date_str = date_cache[raw_date] = sys.intern(date_str)
+
+        home = sys.intern(str(row[AB_HOME] or "").strip())
         spread = row[AB_HOME_LINE_CLOSE]
         ou = row[AB_TOTAL_SCORE_CLOSE]
 
@@ -99,38 +231,38 @@ def build_betting_lookup(filepath):
     return lookup
 
 
-def compute_spread_result(home_score, away_score, spread):
-    if spread is None or home_score is None or away_score is None:
-        return ""
-    try:
-        adjusted = home_score + spread
-        if adjusted > away_score:
-            return "Covered"
-        elif adjusted < away_score:
-            return "Lost"
-        else:
-            return "Push"
-    except (ValueError, TypeError):
-        return ""
-
-
-def compute_ou_result(home_score, away_score, ou):
-    if ou is None or home_score is None or away_score is None:
-        return ""
-    try:
-        total = home_score + away_score
-        if total > ou:
-            return "Over"
-        elif total < ou:
-            return "Under"
-        else:
-            return "Push"
-    except (ValueError, TypeError):
-        return ""
-
-
-def merge_into_excel(filepath, lookup):
-    """Add spread columns to an existing NFL scores Excel file."""
+def to_float_array(values):
+    """Convert a sequence of numbers (or None) to a float64 array, None -> NaN."""
+    return np.array([np.nan if v is None else v for v in values], dtype=np.float64)
+
+
+def classify_results(home_scores, away_scores, spreads, ous):
+    """Return (spread, O/U) result codes 0-3 for parallel float arrays (NaN = missing)."""
+    adjusted = home_scores + spreads
+    spread_codes = np.where(np.isnan(adjusted) | np.isnan(away_scores), 0,
+                            np.where(adjusted > away_scores, 1,
+                                     np.where(adjusted < away_scores, 2, 3)))
+    totals = home_scores + away_scores
+    ou_codes = np.where(np.isnan(totals) | np.isnan(ous), 0,
+                        np.where(totals > ous, 1,
+                                 np.where(totals < ous, 2, 3)))
+    return spread_codes.astype(np.int8), ou_codes.astype(np.int8)
+
+
+def compute_results(home_scores, away_scores, spreads, ous):
+    """Return (spread, O/U) result labels for parallel float arrays."""
+    spread_codes, ou_codes = classify_results(home_scores, away_scores, spreads, ous)
+    return SPREAD_LABELS[spread_codes], OU_LABELS[ou_codes]
+
+
+def merge_into_excel(filepath, lookup, full=False):
+    """Add spread columns to an existing NFL scores Excel file.
+
+    If the columns already exist, only rows after the last one with a spread
+    are merged (games added since the previous run) unless `full` is set.
+    Earlier rows the betting sheet lacked are therefore not retried; the
+    returned (matched, total) counts still cover the whole file.
+    """
     if not os.path.exists(filepath):
         print(f"  File not found: {filepath}")
         return 0, 0
@@ -139,91 +271,125 @@ def merge_into_excel(filepath, lookup):
     wb = load_workbook(filepath)
     ws = wb.active
 
-    header_font = Font(name="Calibri", bold=True, color="FFFFFF", size=11)
-    header_fill = PatternFill(start_color="013369", end_color="013369", fill_type="solid")
-    header_alignment = Alignment(horizontal="center", vertical="center", wrap_text=True)
-    thin_border = Border(bottom=Side(style="thin", color="DDDDDD"))
-
     existing_header = ws.cell(row=1, column=NEW_COL_SPREAD).value
-    if existing_header == "Spread":
+    overwrite = existing_header == "Spread"
+    if overwrite and full:
         print("  Spread columns already exist — overwriting values")
-    else:
+    elif not overwrite:
         for i, header in enumerate(NEW_HEADERS):
             cell = ws.cell(row=1, column=NEW_COL_SPREAD + i, value=header)
-            cell.font = header_font
-            cell.fill = header_fill
-            cell.alignment = header_alignment
+            cell.font = HEADER_FONT
+            cell.fill = HEADER_FILL
+            cell.alignment = HEADER_ALIGNMENT
 
-    covered_fill = PatternFill(start_color="D4EDDA", end_color="D4EDDA", fill_type="solid")
-    lost_fill = PatternFill(start_color="F8D7DA", end_color="F8D7DA", fill_type="solid")
-    over_fill = PatternFill(start_color="FFF3CD", end_color="FFF3CD", fill_type="solid")
+    # Read the columns we need in one pass instead of four ws.cell() lookups per row
+    rows = list(ws.iter_rows(min_row=2, max_col=NEW_COL_SPREAD, values_only=True))
 
-    matched = 0
+    # Rows up to the last filled spread were merged by an earlier run
+    skipped = 0
     total = 0
-
-    for row_idx in range(2, ws.max_row + 1):
-        date_val = ws.cell(row=row_idx, column=COL_DATE + 1).value
-        home_val = ws.cell(row=row_idx, column=COL_HOME + 1).value
-        home_score = ws.cell(row=row_idx, column=COL_HOME_SCORE + 1).value
-        away_score = ws.cell(row=row_idx, column=COL_AWAY_SCORE + 1).value
+    matched = 0
+    if overwrite and not full:
+        skipped = len(rows)
+        while skipped and rows[skipped - 1][NEW_COL_SPREAD - 1] is None:
+            skipped -= 1
+        print(f"  Spread columns already exist — merging {len(rows) - skipped} rows after row {skipped + 1}")
+        # Count skipped games against the same lookup so totals cover the whole file
+        for row in rows[:skipped]:
+            if row[COL_DATE] is not None and row[COL_HOME] is not None:
+                total += 1
+                if (str(row[COL_DATE]).strip()[:10], str(row[COL_HOME]).strip()) in lookup:
+                    matched += 1
+        rows = rows[skipped:]
+
+    n = len(rows)
+    spreads = [None] * n
+    ous = [None] * n
+    home_scores = [None] * n
+    away_scores = [None] * n
+    is_matched = [False] * n
+
+    date_cache = {}
+
+    for i, row in enumerate(rows):
+        date_val = row[COL_DATE]
+        home_val = row[COL_HOME]
 
         if date_val is None or home_val is None:
             continue
 
         total += 1
-        date_str = str(date_val).strip()[:10]
-        home_str = str(home_val).strip()
+        date_str = date_cache.get(date_val)
+        if date_str is None:
+            date_str = date_cache[date_val] = sys.intern(str(date_val).strip()[:10])
+        home_str = sys.intern(str(home_val).strip())
 
         betting = lookup.get((date_str, home_str))
+        if not betting:
+            continue
 
-        if betting:
-            matched += 1
-            spread = betting["spread"]
-            ou = betting["ou"]
+        matched += 1
+        is_matched[i] = True
+        spreads[i] = betting["spread"]
+        ous[i] = betting["ou"]
 
-            try:
-                hs = int(home_score) if home_score is not None else None
-            except (ValueError, TypeError):
-                hs = None
-            try:
-                as_ = int(away_score) if away_score is not None else None
-            except (ValueError, TypeError):
-                as_ = None
-
-            spread_result = compute_spread_result(hs, as_, spread)
-            ou_result = compute_ou_result(hs, as_, ou)
-
-            ws.cell(row=row_idx, column=NEW_COL_SPREAD, value=spread)
-            ws.cell(row=row_idx, column=NEW_COL_OU, value=ou)
-
-            sr_cell = ws.cell(row=row_idx, column=NEW_COL_SPREAD_RESULT, value=spread_result)
-            ou_cell = ws.cell(row=row_idx, column=NEW_COL_OU_RESULT, value=ou_result)
-
-            for c in [ws.cell(row=row_idx, column=NEW_COL_SPREAD),
-                       ws.cell(row=row_idx, column=NEW_COL_OU),
-                       sr_cell, ou_cell]:
-                c.alignment = Alignment(horizontal="center")
-                c.border = thin_border
-
-            if spread_result == "Covered":
-                sr_cell.fill = covered_fill
-            elif spread_result == "Lost":
-                sr_cell.fill = lost_fill
-            if ou_result == "Over":
-                ou_cell.fill = over_fill
-        else:
-            for col in range(NEW_COL_SPREAD, NEW_COL_OU_RESULT + 1):
-                cell = ws.cell(row=row_idx, column=col, value=None)
-                cell.border = thin_border
-                cell.alignment = Alignment(horizontal="center")
+        home_score = row[COL_HOME_SCORE]
+        away_score = row[COL_AWAY_SCORE]
+        try:
+            home_scores[i] = int(home_score) if home_score is not None else None
+        except (ValueError, TypeError):
+            pass
+        try:
+            away_scores[i] = int(away_score) if away_score is not None else None
+        except (ValueError, TypeError):
+            pass
+
+    spread_results, ou_results = compute_results(
+        to_float_array(home_scores), to_float_array(away_scores),
+        to_float_array(spreads), to_float_array(ous))
+
+    for row_idx, (spread, ou, spread_result, ou_result, hit) in enumerate(
+            zip(spreads, ous, spread_results, ou_results, is_matched), start=2 + skipped):
+        if not hit:
+            # Fresh columns are already empty; only stale values need clearing
+            if overwrite:
+                for col in range(NEW_COL_SPREAD, NEW_COL_OU_RESULT + 1):
+                    ws.cell(row=row_idx, column=col).value = None
+            continue
 
-    col_widths = {NEW_COL_SPREAD: 10, NEW_COL_OU: 12, NEW_COL_SPREAD_RESULT: 14, NEW_COL_OU_RESULT: 12}
-    for col, width in col_widths.items():
-        ws.column_dimensions[get_column_letter(col)].width = width
+        sr_cell = ws.cell(row=row_idx, column=NEW_COL_SPREAD_RESULT, value=spread_result)
+        ou_cell = ws.cell(row=row_idx, column=NEW_COL_OU_RESULT, value=ou_result)
+
+        for c in [ws.cell(row=row_idx, column=NEW_COL_SPREAD, value=spread),
+                  ws.cell(row=row_idx, column=NEW_COL_OU, value=ou),
+                  sr_cell, ou_cell]:
+            c.alignment = ALIGN_CENTER
+            c.border = THIN_BORDER
 
-    ws.auto_filter.ref = f"A1:{get_column_letter(NEW_COL_OU_RESULT)}{ws.max_row}"
+        if spread_result == "Covered":
+            sr_cell.fill = COVERED_FILL
+        elif spread_result == "Lost":
+            sr_cell.fill = LOST_FILL
+        if ou_result == "Over":
+            ou_cell.fill = OVER_FILL
 
-    wb.save(filepath)
+    changed = n > 0
+    col_widths = {NEW_COL_SPREAD: 10, NEW_COL_OU: 12, NEW_COL_SPREAD_RESULT: 14, NEW_COL_OU_RESULT: 12}
+    for col, width in col_widths.items():
+        dim = ws.column_dimensions[get_column_letter(col)]
+        if dim.width != width:
+            dim.width = width
+            changed = True
+
+    filter_ref = f"A1:{get_column_letter(NEW_COL_OU_RESULT)}{ws.max_row}"
+    if ws.auto_filter.ref != filter_ref:
+        ws.auto_filter.ref = filter_ref
+        changed = True
+
+    if changed:
+        wb.save(filepath)
+    else:
+        print("  Already up to date — file not re-saved")
     print(f"  Matched: {matched}/{total} games ({matched/total*100:.1f}%)" if total > 0 else "  No games found")
     return matched, total
 
@@ -231,6 +397,12 @@ def merge_into_excel(filepath, lookup):
 def main():
     parser = argparse.ArgumentParser(description="Merge betting spreads into NFL Excel files")
     parser.add_argument("--files", nargs="+", help="Excel files to process")
+    parser.add_argument("--full", action="store_true",
+                        help="Re-merge every row. By default a file that already has spread "
+                             "columns only merges rows after its last filled spread, so earlier "
+                             "games missing from the betting sheet are not retried")
+    parser.add_argument("--no-cache", action="store_true",
+                        help=f"Always re-download and re-parse betting data (cache: {CACHE_DIR})")
     args = parser.parse_args()
 
     excel_files = args.files if args.files else []
@@ -243,19 +415,20 @@ def main():
     print(f"Files: {', '.join(os.path.basename(f) for f in excel_files)}")
     print("=" * 60)
 
-    betting_file = download_betting_data()
+    use_cache = not args.no_cache
+    betting_file = download_betting_data(use_cache)
     if not betting_file:
         print("Failed to download betting data!")
         return
 
     try:
         print("\nBuilding betting data lookup...")
-        lookup = build_betting_lookup(betting_file)
+        lookup = load_betting_lookup(betting_file, use_cache)
 
         total_matched = 0
         total_games = 0
         for filepath in excel_files:
-            m, t = merge_into_excel(filepath, lookup)
+            m, t = merge_into_excel(filepath, lookup, args.full)
             total_matched += m
             total_games += t
 
@@ -263,7 +436,7 @@ def main():
         print(f"Total: {total_matched} games matched with betting data out of {total_games}")
         print("=" * 60)
     finally:
-        if betting_file and os.path.exists(betting_file):
+        if not use_cache and os.path.exists(betting_file):
             os.unlink(betting_file)
 
     print("\nDone!")
@@ -3,8 +3,8 @@
 
 import argparse
 import os
-import json
-from openpyxl import load_workbook
+import orjson
+from python_calamine import CalamineWorkbook
 
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
 DEFAULT_OUTPUT = os.path.join(SCRIPT_DIR, "..", "public", "data.js")
@@ -17,28 +17,42 @@ COL = {
     "Spread": 13, "Over/Under": 14, "Spread Result": 15, "O/U Result": 16,
     "Temperature": 17, "Wind": 18, "Conditions": 19,
 }
+# 0-based positions into a row's value list
+IDX = {name: col - 1 for name, col in COL.items()}
+NUM_COLS = max(COL.values())
+
+# data.js keys, in output order. Games are held column-wise (one list per
+# key); optional keys hold None when absent and are dropped on output.
+FIELDS = ("s", "w", "d", "dt", "tm", "h", "a", "hs", "as", "pt",
+          "sp", "ou", "sr", "our", "tp", "wi", "cd")
 
 
 def read_excel(filepath):
-    """Read an Excel file and return list of game dicts."""
-    wb = load_workbook(filepath, read_only=True, data_only=True)
-    ws = wb.active
-    games = []
-    for row in ws.iter_rows(min_row=2, values_only=False):
-        cells = [c.value for c in row]
-        if len(cells) < 12 or cells[0] is None:
+    """Read an Excel file and return its games as {field: list of values}."""
+    wb = CalamineWorkbook.from_path(filepath)
+    ws = wb.get_sheet_by_index(0)
+    rows = ws.to_python(skip_empty_area=True)
+    games = {field: [] for field in FIELDS}
+    columns = list(games.values())
+    for cells in rows[1:]:
+        # calamine reports empty cells as "" rather than None
+        if len(cells) < 12 or cells[0] in (None, ""):
             continue
-
-        season = cells[COL["Season"] - 1]
-        week = str(cells[COL["Week"] - 1] or "")
-        day = str(cells[COL["Day"] - 1] or "")
-        date = str(cells[COL["Date"] - 1] or "")
-        time_et = str(cells[COL["Time"] - 1] or "")
-        home = str(cells[COL["Home Team"] - 1] or "")
-        away = str(cells[COL["Away Team"] - 1] or "")
-        hs = cells[COL["Home Score"] - 1]
-        away_s = cells[COL["Away Score"] - 1]
-        pt = str(cells[COL["Primetime"] - 1] or "")
+        # Older files lack the betting/weather columns; pad short rows so
+        # every optional field below is a plain index, not a length check
+        if len(cells) < NUM_COLS:
+            cells = list(cells) + [None] * (NUM_COLS - len(cells))
+
+        season = cells[IDX["Season"]]
+        week = str(cells[IDX["Week"]] or "")
+        day = str(cells[IDX["Day"]] or "")
+        date = str(cells[IDX["Date"]] or "")
+        time_et = str(cells[IDX["Time"]] or "")
+        home = str(cells[IDX["Home Team"]] or "")
+        away = str(cells[IDX["Away Team"]] or "")
+        hs = cells[IDX["Home Score"]]
+        away_s = cells[IDX["Away Score"]]
+        pt = str(cells[IDX["Primetime"]] or "")
 
         if not home or not away:
             continue
@@ -57,10 +71,10 @@ def read_excel(filepath):
             away_s = 0
 
         # Read spread/betting columns (may not exist in older files)
-        spread = cells[COL["Spread"] - 1] if len(cells) >= 13 else None
-        ou = cells[COL["Over/Under"] - 1] if len(cells) >= 14 else None
-        spread_result = cells[COL["Spread Result"] - 1] if len(cells) >= 15 else None
-        ou_result = cells[COL["O/U Result"] - 1] if len(cells) >= 16 else None
+        spread = cells[IDX["Spread"]]
+        ou = cells[IDX["Over/Under"]]
+        spread_result = cells[IDX["Spread Result"]]
+        ou_result = cells[IDX["O/U Result"]]
 
         try:
             spread = round(float(spread), 1) if spread is not None else None
@@ -78,31 +92,10 @@ def read_excel(filepath):
         if ou_result == "None":
             ou_result = ""
 
-        game = {
-            "s": int(season),
-            "w": week,
-            "d": day,
-            "dt": date,
-            "tm": time_et,
-            "h": home,
-            "a": away,
-            "hs": hs,
-            "as": away_s,
-            "pt": pt,
-        }
-        if spread is not None:
-            game["sp"] = spread
-        if ou is not None:
-            game["ou"] = ou
-        if spread_result:
-            game["sr"] = spread_result
-        if ou_result:
-            game["our"] = ou_result
-
         # Read weather columns (may not exist in older files)
-        temp = cells[COL["Temperature"] - 1] if len(cells) >= 17 else None
-        wind = cells[COL["Wind"] - 1] if len(cells) >= 18 else None
-        conditions = cells[COL["Conditions"] - 1] if len(cells) >= 19 else None
+        temp = cells[IDX["Temperature"]]
+        wind = cells[IDX["Wind"]]
+        conditions = cells[IDX["Conditions"]]
 
         try:
             temp = int(temp) if temp is not None else None
@@ -116,14 +109,13 @@ def read_excel(filepath):
         if conditions == "None":
             conditions = ""
 
-        if temp is not None:
-            game["tp"] = temp
-        if wind:
-            game["wi"] = wind
-        if conditions:
-            game["cd"] = conditions
-
-        games.append(game)
+        values = (
+            int(season), week, day, date, time_et, home, away, hs, away_s, pt,
+            spread, ou, spread_result or None, ou_result or None,
+            temp, wind or None, conditions or None,
+        )
+        for column, value in zip(columns, values):
+            column.append(value)
 
     wb.close()
     return games
@@ -166,45 +158,44 @@ def main():
         print("No files specified. Use --files <path1> <path2> ...")
         return
 
-    all_games = []
+    games = {field: [] for field in FIELDS}
     for filepath in args.files:
         if not os.path.exists(filepath):
             print(f"Warning: {filepath} not found, skipping")
             continue
-        games = read_excel(filepath)
-        print(f"Read {len(games)} games from {os.path.basename(filepath)}")
-        all_games.extend(games)
-
-    # Deduplicate by (season, date, home, away)
-    seen = set()
-    unique_games = []
-    for g in all_games:
-        key = (g["s"], g["dt"], g["h"], g["a"])
-        if key not in seen:
-            seen.add(key)
-            unique_games.append(g)
-    print(f"Total unique games: {len(unique_games)}")
+        file_games = read_excel(filepath)
+        print(f"Read {len(file_games['s'])} games from {os.path.basename(filepath)}")
+        for field in FIELDS:
+            games[field].extend(file_games[field])
 
-    # Sort by date
-    unique_games.sort(key=lambda g: (g["s"], g["dt"]))
-
-    # Build JS output
-    lines = []
-    for g in unique_games:
-        js = json.dumps(g, separators=(',', ':'))
-        lines.append(js)
+    # Deduplicate by (season, date, home, away); the first file listed wins
+    first = {}
+    for i, key in enumerate(zip(games["s"], games["dt"], games["h"], games["a"])):
+        first.setdefault(key, i)
+    print(f"Total unique games: {len(first)}")
 
-    franchise_js = json.dumps(FRANCHISE_MAP, indent=2)
-
-    js_content = f"// Auto-generated from NFL Excel data — {len(unique_games)} games\n"
-    js_content += f"const NFL_GAMES = [\n" + ",\n".join(lines) + "\n];\n\n"
-    js_content += f"const FRANCHISE_MAP = {franchise_js};\n"
+    # Sort by date
+    sort_keys = list(zip(games["s"], games["dt"]))
+    order = sorted(first.values(), key=sort_keys.__getitem__)
+    field_columns = [(field, games[field]) for field in FIELDS]
 
     # Ensure output directory exists
     os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
 
-    with open(args.output, "w") as f:
-        f.write(js_content)
+    # Stream the JS output game by game rather than building it in memory
+    with open(args.output, "wb") as f:
+        f.write(f"// Auto-generated from NFL Excel data — {len(order)} games\n".encode())
+        f.write(b"const NFL_GAMES = [\n")
+        for n, i in enumerate(order):
+            if n:
+                f.write(b",\n")
+            # Build each game record from the columns only as it is written
+            game = {k: column[i] for k, column in field_columns if column[i] is not None}
+            f.write(orjson.dumps(game))
+        f.write(b"\n];\n\n")
+        f.write(b"const FRANCHISE_MAP = ")
+        f.write(orjson.dumps(FRANCHISE_MAP, option=orjson.OPT_INDENT_2))
+        f.write(b";\n")
 
     size_kb = os.path.getsize(args.output) / 1024
     print(f"Written {args.output} ({size_kb:.0f} KB)")
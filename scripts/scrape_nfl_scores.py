@@ -6,11 +6,17 @@ Supports CLI arguments for year range and output path.
 """
 
 import argparse
+import functools
+import gzip
 import subprocess
-from bs4 import BeautifulSoup
-from openpyxl import Workbook
-from openpyxl.styles import Font, Alignment, PatternFill, Border, Side
-from openpyxl.utils import get_column_letter
+import tempfile
+import threading
+from datetime import date
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import requests
+from requests.adapters import HTTPAdapter
+from selectolax.lexbor import LexborHTMLParser
+import xlsxwriter
 import time
 import sys
 import os
@@ -22,12 +28,27 @@ DEFAULT_END_YEAR = 2024
 BASE_URL = "https://www.pro-football-reference.com/years/{year}/games.htm"
 REQUEST_DELAY = 3.5
 MAX_RETRIES = 3
+MAX_WORKERS = 4
 
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
 DEFAULT_OUTPUT = os.path.join(SCRIPT_DIR, "nfl_scores.xlsx")
 
+CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "nfl-db")
+CACHE_TTL_DAYS = 30
+
 USER_AGENT = "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
 
+# One keep-alive session shared by all workers, so each season reuses an
+# open TLS connection instead of paying a new handshake.
+SESSION = requests.Session()
+SESSION.headers.update({
+    "User-Agent": USER_AGENT,
+    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9",
+    "Accept-Language": "en-US,en;q=0.9",
+    "Accept-Encoding": "gzip, deflate",
+})
+SESSION.mount("https://", HTTPAdapter(pool_maxsize=MAX_WORKERS))
+
 COLUMNS = [
     "Season", "Week", "Day", "Date", "Time (ET)",
     "Home Team", "Away Team",
@@ -35,52 +56,159 @@ COLUMNS = [
     "Winner", "Primetime Slot"
 ]
 
+_TIME_RE = re.compile(r'(\d{1,2}):(\d{2})\s*(AM|PM)')
+_ISO_DATE_RE = re.compile(r'\d{4}-\d{2}-\d{2}')
+_HAS_ALPHA = re.compile(r'[A-Za-z]')
+
+LEFT_ALIGNED_COLUMNS = ("Home Team", "Away Team", "Winner")
+
+# xlsxwriter format properties; formats are registered once per workbook
+HEADER_FORMAT = {
+    "font_name": "Calibri", "bold": True, "font_color": "#FFFFFF", "font_size": 11,
+    "bg_color": "#013369", "pattern": 1,
+    "align": "center", "valign": "vcenter", "text_wrap": True,
+}
+CELL_FORMAT = {"bottom": 1, "bottom_color": "#DDDDDD"}
+# Checked in order: the first slot contained in the cell value picks the fill
+PRIMETIME_FILLS = {"MNF": "#FFF3CD", "SNF": "#D1ECF1", "TNF": "#D4EDDA"}
+
+
+# Requests from all worker threads share one schedule: each fetch claims the
+# next slot, spaced REQUEST_DELAY apart so the per-host rate matches a serial
+# run (PFR blocks clients above ~20 requests/minute). A 429 pauses everyone
+# until _paused_until, including workers already sleeping on a claimed slot.
+# Workers overlap parsing and cache hits with the next fetch, not fetches
+# with each other.
+_schedule_lock = threading.Lock()
+_next_request_at = 0.0
+_paused_until = 0.0
+
+
+def wait_for_request_slot():
+    """Block until this thread may issue its next request."""
+    global _next_request_at
+    while True:
+        with _schedule_lock:
+            now = time.monotonic()
+            slot = max(now, _next_request_at, _paused_until)
+            _next_request_at = slot + REQUEST_DELAY
+        time.sleep(slot - now)
+        # A 429 may have arrived while we slept; if so, queue up again after the pause
+        with _schedule_lock:
+            if time.monotonic() >= _paused_until:
+                return
+
+
+def back_off_all(wait):
+    """Pause every worker's requests for at least `wait` seconds."""
+    global _next_request_at, _paused_until
+    with _schedule_lock:
+        _paused_until = max(_paused_until, time.monotonic() + wait)
+        _next_request_at = max(_next_request_at, _paused_until)
+
+
+def curl_get(url):
+    """Fetch a URL using curl (bypasses PFR's Python request blocking).
+
+    Returns (status_code, body); status is 0 if curl reported none.
+    """
+    result = subprocess.run(
+        [
+            "curl", "-s", "-L",
+            "-A", USER_AGENT,
+            "-H", "Accept: text/html,application/xhtml+xml,application/xml;q=0.9",
+            "-H", "Accept-Language: en-US,en;q=0.9",
+            "-H", "Accept-Encoding: identity",
+            "--max-time", "30",
+            "-w", "\n%{http_code}",
+            url
+        ],
+        capture_output=True, text=True, timeout=45
+    )
+    body, _, status_code = result.stdout.rpartition("\n")
+    status_code = status_code.strip()
+    return (int(status_code) if status_code.isdigit() else 0), body
+
+
+# Set once the session gets a 403; from then on every fetch goes through curl
+_use_curl = False
+
 
 def fetch_page(url, retries=MAX_RETRIES):
-    """Fetch a URL using curl (bypasses PFR's Python request blocking)."""
+    """Fetch a URL over the shared session, switching to curl if PFR answers 403.
+
+    PFR has blocked Python HTTP clients before; curl has historically got
+    through, so after the first 403 the rest of the run uses curl_get. The
+    curl retry takes its own slot on the shared schedule.
+    """
+    global _use_curl
     for attempt in range(retries):
+        wait_for_request_slot()
         try:
-            result = subprocess.run(
-                [
-                    "curl", "-s", "-L",
-                    "-A", USER_AGENT,
-                    "-H", "Accept: text/html,application/xhtml+xml,application/xml;q=0.9",
-                    "-H", "Accept-Language: en-US,en;q=0.9",
-                    "-H", "Accept-Encoding: identity",
-                    "--max-time", "30",
-                    "-w", "\n%{http_code}",
-                    url
-                ],
-                capture_output=True, text=True, timeout=45
-            )
-            output = result.stdout
-            lines = output.rsplit("\n", 1)
-            if len(lines) == 2:
-                html, status_code = lines[0], lines[1].strip()
+            if _use_curl:
+                status_code, html = curl_get(url)
             else:
-                html, status_code = output, "000"
-
-            if status_code == "200" and html:
+                response = SESSION.get(url, timeout=30)
+                status_code, html = response.status_code, response.text
+                if status_code == 403:
+                    print("  HTTP 403 from session, switching to curl")
+                    _use_curl = True
+                    wait_for_request_slot()
+                    status_code, html = curl_get(url)
+
+            if status_code == 200 and html:
                 return html
-            elif status_code == "429":
+            elif status_code == 429:
                 wait = (attempt + 1) * 15
                 print(f"  Rate limited (429). Waiting {wait}s...")
-                time.sleep(wait)
+                back_off_all(wait)
             else:
                 print(f"  HTTP {status_code} for {url}")
                 time.sleep(5)
-        except (subprocess.TimeoutExpired, Exception) as e:
+        except (requests.RequestException, subprocess.SubprocessError, OSError) as e:
             print(f"  Fetch error (attempt {attempt+1}): {e}")
             time.sleep(5)
     return None
 
 
+def current_season():
+    """Return the NFL season in progress (Sept-Feb) or most recently finished."""
+    today = date.today()
+    return today.year if today.month >= 9 else today.year - 1
+
+
+def page_cache_path(year):
+    return os.path.join(CACHE_DIR, f"pfr-{year}.html.gz")
+
+
+def read_cached_page(year):
+    """Return the cached HTML for a season, or None if missing or older than CACHE_TTL_DAYS."""
+    path = page_cache_path(year)
+    try:
+        age_days = (time.time() - os.path.getmtime(path)) / 86400
+        if age_days > CACHE_TTL_DAYS:
+            return None
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            return f.read()
+    except (OSError, EOFError):
+        return None
+
+
+def write_cached_page(year, html):
+    """Atomically store a season's HTML in the page cache."""
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    tmp = tempfile.NamedTemporaryFile(suffix=".html.gz", dir=CACHE_DIR, delete=False)
+    with tmp, gzip.open(tmp, "wt", encoding="utf-8") as f:
+        f.write(html)
+    os.replace(tmp.name, page_cache_path(year))
+
+
 def parse_time(time_str):
     """Parse time string like '8:20PM' into (hour_24, minute)."""
     if not time_str:
         return None, None
     time_str = time_str.strip().upper()
-    match = re.match(r'(\d{1,2}):(\d{2})\s*(AM|PM)', time_str)
+    match = _TIME_RE.match(time_str)
     if not match:
         return None, None
     hour = int(match.group(1))
@@ -93,6 +221,7 @@ def parse_time(time_str):
     return hour, minute
 
 
+@functools.lru_cache(maxsize=None)
 def detect_primetime(day, time_str, season):
     """Detect if a game is a primetime game."""
     if not day or not time_str:
@@ -126,75 +255,85 @@ def detect_primetime(day, time_str, season):
     return ""
 
 
-def scrape_season(year):
+def scrape_season(year, use_cache=True, refresh=False):
     """Scrape all games for a given season from PFR."""
-    url = BASE_URL.format(year=year)
-    html = fetch_page(url)
+    # The season in progress changes weekly, so it always comes from PFR
+    cacheable = use_cache and year < current_season()
+    html = read_cached_page(year) if cacheable and not refresh else None
+    fetched = html is None
+    if fetched:
+        html = fetch_page(BASE_URL.format(year=year))
     if not html:
         print(f"  FAILED to fetch {year}")
         return []
 
-    soup = BeautifulSoup(html, "html.parser")
+    tree = LexborHTMLParser(html)
 
-    table = soup.find("table", id="games")
-    if not table:
-        table = soup.find("table")
-        if not table:
+    table = tree.css_first("table#games")
+    if table is None:
+        table = tree.css_first("table")
+        if table is None:
             print(f"  No table found for {year}")
             return []
 
-    tbody = table.find("tbody")
-    if not tbody:
+    tbody = table.css_first("tbody")
+    if tbody is None:
         print(f"  No tbody found for {year}")
         return []
 
     games = []
-    for row in tbody.find_all("tr"):
-        if row.find("th", {"scope": "col"}):
+    has_unplayed = False
+    for row in tbody.css("tr"):
+        # PFR repeats the header row inside tbody, marked class="thead"
+        if "thead" in (row.attributes.get("class") or "").split():
             continue
 
-        week_el = row.find(["th", "td"], {"data-stat": "week_num"})
-        day_el = row.find("td", {"data-stat": "game_day_of_week"})
-        date_el = row.find("td", {"data-stat": "game_date"})
-        time_el = row.find("td", {"data-stat": "gametime"})
-        winner_el = row.find("td", {"data-stat": "winner"})
-        location_el = row.find("td", {"data-stat": "game_location"})
-        loser_el = row.find("td", {"data-stat": "loser"})
-        pts_win_el = row.find("td", {"data-stat": "pts_win"})
-        pts_lose_el = row.find("td", {"data-stat": "pts_lose"})
-
-        if not winner_el or not loser_el:
+        # Index the row's cells by data-stat in one pass instead of a lookup per field.
+        # Only the week is a <th>; header rows use <th> for every column, so
+        # restricting the rest to <td> keeps them out even without class="thead".
+        cells = {}
+        for c in row.iter():
+            stat = c.attributes.get("data-stat")
+            if c.tag == "td" or (c.tag == "th" and stat == "week_num"):
+                cells[stat] = c
+        winner_el = cells.get("winner")
+        loser_el = cells.get("loser")
+        if winner_el is None or loser_el is None:
             continue
 
-        week = week_el.get_text(strip=True) if week_el else ""
-        day = day_el.get_text(strip=True) if day_el else ""
-        game_time = time_el.get_text(strip=True) if time_el else ""
-        winner = winner_el.get_text(strip=True) if winner_el else ""
-        loser = loser_el.get_text(strip=True) if loser_el else ""
-        location = location_el.get_text(strip=True) if location_el else ""
-
-        if date_el:
-            csk = date_el.get("csk", "")
-            text_date = date_el.get_text(strip=True)
-            if csk and not csk.startswith("zz") and re.match(r'\d{4}-\d{2}-\d{2}', csk):
+        stats = {stat: c.text(strip=True) for stat, c in cells.items()}
+        week = stats.get("week_num", "")
+        day = stats.get("game_day_of_week", "")
+        game_time = stats.get("gametime", "")
+        winner = stats["winner"]
+        loser = stats["loser"]
+        location = stats.get("game_location", "")
+
+        if not winner or winner.startswith("Week") or not _HAS_ALPHA.search(winner):
+            continue
+
+        date_el = cells.get("game_date")
+        if date_el is not None:
+            csk = date_el.attributes.get("csk") or ""
+            if csk and not csk.startswith("zz") and _ISO_DATE_RE.match(csk):
                 date = csk
             else:
-                date = text_date
+                date = stats["game_date"]
         else:
             date = ""
 
+        if not stats.get("pts_win") and not stats.get("pts_lose"):
+            has_unplayed = True
+
         try:
-            pts_win = int(pts_win_el.get_text(strip=True)) if pts_win_el else 0
-        except (ValueError, AttributeError):
+            pts_win = int(stats.get("pts_win", 0))
+        except ValueError:
             pts_win = 0
         try:
-            pts_lose = int(pts_lose_el.get_text(strip=True)) if pts_lose_el else 0
-        except (ValueError, AttributeError):
+            pts_lose = int(stats.get("pts_lose", 0))
+        except ValueError:
             pts_lose = 0
 
-        if not winner or winner.startswith("Week") or not any(c.isalpha() for c in winner):
-            continue
-
         if location == "@":
             home_team = loser
             away_team = winner
@@ -229,61 +368,51 @@ def scrape_season(year):
             "Primetime Slot": primetime,
         })
 
+    # Only cache pages that parsed into a finished season, never block or
+    # error pages that happened to come back with HTTP 200
+    if fetched and cacheable and games and not has_unplayed:
+        write_cached_page(year, html)
+
     return games
 
 
 def write_excel(all_games, filepath):
     """Write all game data to a formatted Excel spreadsheet."""
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "NFL Scores"
-
-    header_font = Font(name="Calibri", bold=True, color="FFFFFF", size=11)
-    header_fill = PatternFill(start_color="013369", end_color="013369", fill_type="solid")
-    header_alignment = Alignment(horizontal="center", vertical="center", wrap_text=True)
-    thin_border = Border(bottom=Side(style="thin", color="DDDDDD"))
-
-    mnf_fill = PatternFill(start_color="FFF3CD", end_color="FFF3CD", fill_type="solid")
-    snf_fill = PatternFill(start_color="D1ECF1", end_color="D1ECF1", fill_type="solid")
-    tnf_fill = PatternFill(start_color="D4EDDA", end_color="D4EDDA", fill_type="solid")
-
-    for col_idx, col_name in enumerate(COLUMNS, 1):
-        cell = ws.cell(row=1, column=col_idx, value=col_name)
-        cell.font = header_font
-        cell.fill = header_fill
-        cell.alignment = header_alignment
-
-    ws.freeze_panes = "A2"
-
-    for row_idx, game in enumerate(all_games, 2):
-        for col_idx, col_name in enumerate(COLUMNS, 1):
-            value = game.get(col_name, "")
-            cell = ws.cell(row=row_idx, column=col_idx, value=value)
-            cell.border = thin_border
-            cell.alignment = Alignment(horizontal="center" if col_name not in ("Home Team", "Away Team", "Winner") else "left")
-
-        primetime = game.get("Primetime Slot", "")
-        if primetime:
-            fill = None
-            if "MNF" in primetime:
-                fill = mnf_fill
-            elif "SNF" in primetime:
-                fill = snf_fill
-            elif "TNF" in primetime:
-                fill = tnf_fill
-            if fill:
-                ws.cell(row=row_idx, column=COLUMNS.index("Primetime Slot") + 1).fill = fill
+    # constant_memory streams each row to disk as soon as the next one starts
+    wb = xlsxwriter.Workbook(filepath, {"constant_memory": True})
+    ws = wb.add_worksheet("NFL Scores")
+
+    header_fmt = wb.add_format(HEADER_FORMAT)
+    center_fmt = wb.add_format({**CELL_FORMAT, "align": "center"})
+    left_fmt = wb.add_format({**CELL_FORMAT, "align": "left"})
+    primetime_fmts = {
+        slot: wb.add_format({**CELL_FORMAT, "align": "center", "bg_color": color, "pattern": 1})
+        for slot, color in PRIMETIME_FILLS.items()
+    }
 
     col_widths = {
         "Season": 9, "Week": 14, "Day": 6, "Date": 12, "Time (ET)": 10,
         "Home Team": 26, "Away Team": 26, "Home Score": 11, "Away Score": 11,
         "Score Difference": 14, "Winner": 26, "Primetime Slot": 18,
     }
-    for col_idx, col_name in enumerate(COLUMNS, 1):
-        ws.column_dimensions[get_column_letter(col_idx)].width = col_widths.get(col_name, 15)
+    for col_idx, col_name in enumerate(COLUMNS):
+        ws.set_column(col_idx, col_idx, col_widths.get(col_name, 15))
+
+    ws.write_row(0, 0, COLUMNS, header_fmt)
+    ws.freeze_panes(1, 0)
+
+    formats = [left_fmt if c in LEFT_ALIGNED_COLUMNS else center_fmt for c in COLUMNS]
+    primetime_col = COLUMNS.index("Primetime Slot")
+
+    for row_idx, game in enumerate(all_games, 1):
+        for col_idx, (col_name, fmt) in enumerate(zip(COLUMNS, formats)):
+            value = game.get(col_name, "")
+            if col_idx == primetime_col and value:
+                fmt = next((f for slot, f in primetime_fmts.items() if slot in value), fmt)
+            ws.write(row_idx, col_idx, value, fmt)
 
-    ws.auto_filter.ref = f"A1:{get_column_letter(len(COLUMNS))}{len(all_games) + 1}"
-    wb.save(filepath)
+    ws.autofilter(0, 0, len(all_games), len(COLUMNS) - 1)
+    wb.close()
     print(f"\nSaved to: {filepath}")
 
 
@@ -292,6 +421,10 @@ def main():
     parser.add_argument("--start-year", type=int, default=DEFAULT_START_YEAR, help="First season to scrape")
     parser.add_argument("--end-year", type=int, default=DEFAULT_END_YEAR, help="Last season to scrape")
     parser.add_argument("--output", default=DEFAULT_OUTPUT, help="Output Excel file path")
+    parser.add_argument("--no-cache", action="store_true",
+                        help=f"Always fetch from PFR and don't store pages (cache: {CACHE_DIR})")
+    parser.add_argument("--refresh-year", type=int, action="append", default=[], metavar="YEAR",
+                        help="Re-fetch this season even if cached (repeatable)")
     args = parser.parse_args()
 
     print("=" * 60)
@@ -301,22 +434,29 @@ def main():
     print(f"Output: {args.output}")
     print("=" * 60)
 
-    all_games = []
+    years = list(range(args.start_year, args.end_year + 1))
+    season_games = {}
     failed_seasons = []
 
-    for year in range(args.start_year, args.end_year + 1):
-        print(f"\nScraping {year} season... ", end="", flush=True)
-        games = scrape_season(year)
-
-        if games:
-            all_games.extend(games)
-            print(f"{len(games)} games found")
-        else:
-            failed_seasons.append(year)
-            print("NO GAMES FOUND")
+    print(f"\nScraping {len(years)} seasons with {MAX_WORKERS} workers...")
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as pool:
+        futures = {
+            pool.submit(scrape_season, year, not args.no_cache, year in args.refresh_year): year
+            for year in years
+        }
+        for future in as_completed(futures):
+            year = futures[future]
+            games = future.result()
+            if games:
+                season_games[year] = games
+                print(f"  {year}: {len(games)} games found")
+            else:
+                failed_seasons.append(year)
+                print(f"  {year}: NO GAMES FOUND")
 
-        if year < args.end_year:
-            time.sleep(REQUEST_DELAY)
+    # Reassemble in season order so output matches a serial run
+    all_games = [g for year in years for g in season_games.get(year, [])]
+    failed_seasons.sort()
 
     print("\n" + "=" * 60)
     print(f"Total games scraped: {len(all_games):,}")